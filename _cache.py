@@ -0,0 +1,116 @@
+import functools
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+
+# Root directory of the persistent cache
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "spacecraft_localizer")
+
+def _remove(path):
+    """Deletes a cache entry, ignoring files that are already gone or locked."""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def _prune(directory, max_age, now):
+    """Deletes the entries of `directory` that are older than max_age seconds."""
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for name in names:
+        if not name.endswith(".pkl"):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            if now - os.path.getmtime(path) >= max_age:
+                _remove(path)
+        except OSError:
+            pass
+
+def disk_cache(namespace, key=None, max_age=None):
+    """
+    Decorator that memoizes a fetch function in memory and on disk.
+
+    Results are kept in a per-process dictionary and pickled under
+    CACHE_DIR/<namespace>/<hash>.pkl, where the hash is taken over the call
+    arguments, so repeated runs for the same query skip the network entirely.
+    A result of None is treated as a failed fetch and is never cached.
+    With max_age set, an entry is refetched once its file is older than
+    that, both from disk and from the in-memory layer, and expired files are
+    deleted whenever a new entry is written, so time-keyed queries do not
+    accumulate in the directory. Entries that cannot be unpickled are
+    deleted and fetched again.
+
+    Args:
+        namespace (str): Subdirectory of CACHE_DIR holding this function's entries.
+        key (callable): Optional function called with the same arguments as
+            the decorated function, returning the content to hash instead of
+            the raw arguments (e.g. the full remote request), so that calls
+            issuing identical requests share one entry.
+        max_age (float): Optional lifetime of an entry in seconds; older
+            entries are fetched again (default: entries never expire).
+    """
+    directory = os.path.join(CACHE_DIR, namespace)
+
+    def decorator(func):
+        memory = {}
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if key is None:
+                content = repr((func.__qualname__, args, sorted(kwargs.items())))
+            else:
+                content = repr((func.__qualname__, key(*args, **kwargs)))
+            now = time.time()
+            if content in memory:
+                expires, result = memory[content]
+                if expires is None or now < expires:
+                    return result
+
+            path = os.path.join(directory, hashlib.sha1(content.encode()).hexdigest() + ".pkl")
+            try:
+                created = os.path.getmtime(path)
+            except OSError:
+                created = None
+            if created is not None and max_age is not None and now - created >= max_age:
+                _remove(path)
+                created = None
+            if created is not None:
+                try:
+                    with open(path, "rb") as f:
+                        result = pickle.load(f)
+                except OSError:
+                    created = None
+                except Exception:
+                    # Truncated files, or pickles of classes that have since
+                    # changed, fail with a variety of exception types
+                    _remove(path)
+                    created = None
+
+            if created is None:
+                created = now
+                result = func(*args, **kwargs)
+                if result is None:
+                    return None
+                try:
+                    # Write to a temporary file first so concurrent readers
+                    # never see a partially written entry
+                    os.makedirs(directory, exist_ok=True)
+                    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as f:
+                        pickle.dump(result, f)
+                    os.replace(f.name, path)
+                except OSError as e:
+                    print(f"Could not write cache entry {path}: {str(e)}")
+                if max_age is not None:
+                    _prune(directory, max_age, now)
+
+            memory[content] = (None if max_age is None else created + max_age, result)
+            return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,226 @@
+import functools
+import os
+import numpy as np
+
+# Set SPACECRAFT_BACKEND=agg to render off-screen: figures are then saved as
+# PNG files instead of being shown.
+BACKEND = os.environ.get('SPACECRAFT_BACKEND', 'auto').lower()
+
+@functools.lru_cache(maxsize=None)
+def pyplot():
+    """
+    Imports matplotlib.pyplot on first use and returns it.
+
+    matplotlib is only loaded once something is actually plotted, so runs that
+    just print coordinates never pay its import time and memory. The backend
+    selected through SPACECRAFT_BACKEND is applied before pyplot is imported.
+    The '3d' projection needs no explicit mpl_toolkits.mplot3d import: since
+    matplotlib 3.2 it is loaded on the first add_subplot(projection='3d').
+    """
+    import matplotlib
+    if BACKEND == 'agg':
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+def _float32(values):
+    """Returns `values` as a C-contiguous float32 array (no copy if it already is one)."""
+    return np.ascontiguousarray(values, dtype=np.float32)
+
+def scatter_bodies(ax, bodies, colors, sizes):
+    """
+    Draws a set of bodies on a 3D axis with a single scatter call.
+
+    All points share one artist, so the artist count stays at 1 regardless of
+    how many bodies (or trajectory samples) are drawn. Bodies are named in
+    the legend, whose entries are built from proxy markers since a single
+    scatter carries only one label.
+
+    Args:
+        ax: 3D matplotlib axis.
+        bodies: Positions of the N bodies; their labels name the legend
+            entries. Unit conversions should be done beforehand in float64;
+            the coordinates are cast to contiguous float32 arrays here.
+        colors: Sequence of N matplotlib colors.
+        sizes: Sequence of N marker sizes (points^2).
+
+    Returns:
+        The PathCollection created by ax.scatter.
+    """
+    from matplotlib.lines import Line2D
+
+    x, y, z = _float32(bodies.x), _float32(bodies.y), _float32(bodies.z)
+    sizes = np.asarray(sizes, dtype=np.float32)
+
+    scatter = ax.scatter(x, y, z, c=list(colors), s=sizes, depthshade=False)
+
+    # Bodies are identified through the legend (drawn once in screen space)
+    # rather than per-point ax.text labels, which are re-projected on every
+    # redraw. One legend entry per distinct label (trajectories repeat theirs)
+    handles = {}
+    for color, size, label in zip(colors, sizes, bodies.labels):
+        if label not in handles:
+            handles[label] = Line2D([], [], linestyle='none', marker='o', color=color,
+                                    markersize=np.sqrt(size), label=label)
+    ax.legend(handles=list(handles.values()))
+    return scatter
+
+def plot_surface_quads(ax, x, y, z, facecolors, lightsource=None, **kwargs):
+    """
+    Draws a gridded surface as a single Poly3DCollection built with slicing.
+
+    Equivalent to ax.plot_surface(x, y, z, facecolors=..., rstride=1,
+    cstride=1) with its default shading, but the quads, their normals and
+    the shaded colors are computed with whole-array operations, whereas
+    plot_surface loops over the cells in Python when facecolors are given.
+
+    Args:
+        ax: 3D matplotlib axis.
+        x, y, z: Arrays of shape (n, m) with the vertices of the grid.
+        facecolors: RGBA colors of shape (n - 1, m - 1, 4), one per quad
+            (plot_surface samples them at the first vertex of each cell),
+            either floats in [0, 1] or uint8 as from cmap(..., bytes=True).
+        lightsource: matplotlib.colors.LightSource used for shading
+            (default: the one used by plot_surface).
+        **kwargs: Passed on to Poly3DCollection (alpha, linewidth, ...).
+
+    Returns:
+        The Poly3DCollection added to the axis.
+    """
+    from matplotlib.colors import LightSource
+    from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+
+    grid = np.stack((x, y, z), axis=-1)
+    # Corners of every cell, in the order plot_surface traces them
+    quads = np.stack((grid[:-1, :-1], grid[:-1, 1:], grid[1:, 1:], grid[1:, :-1]),
+                     axis=-2).reshape(-1, 4, 3)
+
+    # Shade each quad by the angle between its normal and the light,
+    # mapping cos(angle) from [-1, 1] to a brightness in [0.3, 1]
+    if lightsource is None:
+        lightsource = LightSource(azdeg=225, altdeg=19.4712)
+    normals = np.cross(quads[:, 0] - quads[:, 1], quads[:, 1] - quads[:, 2])
+    with np.errstate(invalid='ignore'):
+        shade = (normals / np.linalg.norm(normals, axis=1, keepdims=True)) @ lightsource.direction
+    shade[np.isnan(shade)] = 0
+    colors = np.asarray(facecolors).reshape(-1, 4)
+    scale = 1 / 255 if colors.dtype == np.uint8 else 1
+    colors = colors.astype(np.float32) * np.float32(scale)
+    colors[:, :3] *= (0.3 + 0.35 * (shade + 1))[:, np.newaxis]
+
+    collection = Poly3DCollection(quads, facecolors=colors, edgecolors=colors, **kwargs)
+    had_data = ax.has_data()
+    ax.add_collection3d(collection)
+    ax.auto_scale_xyz(x, y, z, had_data)
+    return collection
+
+def show_figure(fig, filename, dpi=120):
+    """
+    Shows a figure, or saves it as a PNG when running non-interactively.
+
+    With the Agg backend (SPACECRAFT_BACKEND=agg, MPLBACKEND=Agg, or a headless
+    session) plt.show() would silently do nothing, so the figure is written
+    to `filename` instead and closed.
+
+    Args:
+        fig: matplotlib figure to display.
+        filename (str): Output path used in non-interactive mode.
+        dpi (int): Resolution of the saved image.
+    """
+    plt = pyplot()
+    if plt.get_backend().lower() == 'agg':
+        fig.savefig(filename, dpi=dpi)
+        plt.close(fig)
+        print(f"\nPlot saved as '{filename}'")
+    else:
+        plt.show()
+
+def plot_positions_vispy(bodies, colors, sizes, title="Spacecraft Positions"):
+    """
+    Renders bodies with VisPy, uploading all points to the GPU at once.
+
+    The positions are sent as one contiguous float32 buffer through a single
+    Markers.set_data call, so rotating the view is a pure GPU redraw instead
+    of matplotlib's per-frame re-projection and depth sort.
+
+    Args:
+        bodies: Positions of the N bodies.
+        colors: Sequence of N matplotlib colors.
+        sizes: Sequence of N marker sizes (points^2, as for ax.scatter).
+        title (str): Window title.
+
+    Returns:
+        True if the scene was shown, False if VisPy is not installed.
+    """
+    try:
+        from vispy import app, scene
+        from matplotlib.colors import to_rgba_array
+    except ImportError:
+        print("VisPy is not installed; falling back to matplotlib")
+        return False
+
+    canvas = scene.SceneCanvas(title=title, keys='interactive', show=True)
+    view = canvas.central_widget.add_view()
+    view.camera = 'turntable'
+
+    markers = scene.visuals.Markers(parent=view.scene)
+    markers.set_data(pos=_float32(bodies.to_array()),
+                     face_color=to_rgba_array(list(colors)),
+                     # VisPy sizes are diameters in pixels, scatter sizes are areas
+                     size=np.sqrt(np.asarray(sizes, dtype=np.float32)),
+                     edge_width=0)
+    scene.visuals.XYZAxis(parent=view.scene)
+    view.camera.set_range()
+
+    app.run()
+    return True
+
+def plot_positions_pyvista(bodies, colors, sizes, surface=None, filename=None,
+                           title="Spacecraft Positions"):
+    """
+    Renders bodies, and optionally a colored surface, with PyVista (VTK).
+
+    The surface is uploaded as one structured grid and rasterized on the GPU,
+    avoiding mplot3d's Python-side depth sort of every quad.
+
+    Args:
+        bodies: Positions of the N bodies.
+        colors: Sequence of N matplotlib colors.
+        sizes: Sequence of N marker sizes (points^2, as for ax.scatter).
+        surface: Optional (x, y, z, B) grids; B is drawn on a log color scale.
+        filename (str): If given, a screenshot is saved to this path.
+        title (str): Window title.
+
+    Returns:
+        True if the scene was rendered, False if PyVista is not installed.
+    """
+    try:
+        import pyvista as pv
+        from matplotlib.colors import to_rgba_array
+    except ImportError:
+        print("PyVista is not installed; falling back to matplotlib")
+        return False
+
+    plotter = pv.Plotter(title=title, off_screen=BACKEND == 'agg')
+    if surface is not None:
+        x, y, z, B = surface
+        grid = pv.StructuredGrid(_float32(x), _float32(y), _float32(z))
+        # StructuredGrid orders its points with the first axis varying fastest
+        grid['B'] = np.ravel(B, order='F')
+        plotter.add_mesh(grid, scalars='B', log_scale=True, cmap='viridis', opacity=0.8)
+
+    # VTK point sizes are diameters in pixels, scatter sizes are areas
+    for size in np.unique(sizes):
+        selected = np.flatnonzero(np.asarray(sizes) == size)
+        plotter.add_points(_float32(bodies.to_array()[selected]),
+                           scalars=to_rgba_array([colors[i] for i in selected]),
+                           rgba=True, point_size=float(np.sqrt(size)),
+                           render_points_as_spheres=True)
+    plotter.add_legend([[label, color] for label, color in
+                        dict(zip(bodies.labels, colors)).items()])
+    plotter.show_axes()
+
+    plotter.show(screenshot=filename)
+    if filename is not None:
+        print(f"\nPlot saved as '{filename}'")
+    return True
@@ -1,78 +1,247 @@
-from astroquery.jplhorizons import Horizons
 import datetime
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D  # Registers the 3D projection
+import functools
+import re
+from _plot_backend import plot_positions_vispy, pyplot, scatter_bodies, show_figure
+import numpy as np
+from _cache import disk_cache
+from positions import Positions
+
+# Horizons REST endpoint, queried directly instead of through astroquery
+HORIZONS_URL = "https://ssd.jpl.nasa.gov/api/horizons.api"
+
+# Query parameters shared by every vector request: heliocentric ecliptic
+# x, y, z in AU, returned as CSV rows between the $$SOE and $$EOE markers
+HORIZONS_VECTOR_PARAMS = {
+    'format': 'text',
+    'MAKE_EPHEM': 'YES',
+    'EPHEM_TYPE': 'VECTORS',
+    'CENTER': "'@sun'",
+    'REF_PLANE': 'ECLIPTIC',
+    'OUT_UNITS': 'AU-D',
+    'VEC_TABLE': '1',
+    'CSV_FORMAT': 'YES',
+    'OBJ_DATA': 'NO',
+}
+
+# Epoch format used throughout, and the width of single-position windows
+EPOCH_FORMAT = "%Y-%m-%d %H:%M"
+_ONE_MIN = datetime.timedelta(minutes=1)
+
+# Horizons step sizes supported by fetch_psp_positions_at (a count followed
+# by a unit in minutes, hours or days, e.g. '10m', '1 h', '2days'), and the
+# matching numpy timedelta64 units
+_STEP_PATTERN = re.compile(r"\s*(\d+)\s*(m|min|minute|h|hr|hour|d|day)s?\s*", re.IGNORECASE)
+_STEP_UNITS = {'m': 'm', 'h': 'h', 'd': 'D'}
 
 def fetch_psp_position_horizons(date=None):
     """
     Fetches the Parker Solar Probe (PSP) position from JPL Horizons.
     
+    Thin wrapper around fetch_psp_positions_horizons that queries a 1-minute
+    window starting at `date` and returns its first sample. The window goes
+    through the same Horizons cache as the trajectory fetches.
+    
+    Args:
+        date (str): Epoch formatted as "%Y-%m-%d %H:%M" (default: now, UTC).
+    
     Returns:
-        Tuple (x, y, z) in AU relative to the Sun.
+        Positions of length 1 in AU relative to the Sun.
     """
     if date is None:
-        # Update to use the new recommended way to get UTC time
-        date = datetime.datetime.now(datetime.UTC).strftime("%Y-%m-%d %H:%M")
-    
-    # Create a time window of 1 minute to avoid the "start must be earlier than stop" error
-    psp = Horizons(id='-96', 
-                   location='@sun',
-                   epochs={
-                       'start': date,
-                       'stop': (datetime.datetime.strptime(date, "%Y-%m-%d %H:%M") + 
-                               datetime.timedelta(minutes=1)).strftime("%Y-%m-%d %H:%M"),
-                       'step': '1m'
-                   })
-    vectors = psp.vectors()
-    x = float(vectors['x'][0])
-    y = float(vectors['y'][0])
-    z = float(vectors['z'][0])
-    return x, y, z
+        # Current time in UTC, truncated to the minute. The window is built
+        # straight from the datetime, skipping the format/parse round trip
+        now = datetime.datetime.now(datetime.timezone.utc).replace(second=0, microsecond=0)
+        start, stop = now.strftime(EPOCH_FORMAT), (now + _ONE_MIN).strftime(EPOCH_FORMAT)
+    else:
+        start, stop = _epoch_window(date)
+    return fetch_psp_positions_horizons(start, stop, step='1m')[:1]
 
-def plot_positions(psp_pos):
+@functools.lru_cache(maxsize=128)
+def _epoch_window(date):
     """
-    Plots a 3D scatter plot of the PSP position along with the Sun and Earth.
+    Builds the 1-minute Horizons window starting at `date`.
+    
+    A window is needed to avoid the "start must be earlier than stop" error.
     
     Args:
-        psp_pos: Tuple (x, y, z) position of PSP in AU.
+        date (str): Epoch formatted as "%Y-%m-%d %H:%M".
+    
+    Returns:
+        Tuple (start, stop) of epoch strings in the same format.
     """
-    fig = plt.figure()
-    ax = fig.add_subplot(111, projection='3d')
+    stop = datetime.datetime.fromisoformat(date) + _ONE_MIN
+    return date, stop.strftime(EPOCH_FORMAT)
+
+def fetch_psp_positions_horizons(start, stop, step='1h'):
+    """
+    Fetches the Parker Solar Probe (PSP) trajectory from JPL Horizons.
+    
+    The whole time range is retrieved with a single Horizons request, and
+    results are cached on disk (see _cache.disk_cache), so repeated calls for
+    the same window do not hit the network.
+    
+    Args:
+        start (str): First epoch, formatted as "%Y-%m-%d %H:%M".
+        stop (str): Last epoch, formatted as "%Y-%m-%d %H:%M".
+        step (str): Horizons step size (e.g. '1m', '1h', '1d').
     
-    # Plot PSP position
-    ax.scatter(psp_pos[0], psp_pos[1], psp_pos[2], color='red', s=100, label="PSP")
-    ax.text(psp_pos[0], psp_pos[1], psp_pos[2], "PSP", color='red')
+    Returns:
+        Positions of length N in AU relative to the Sun.
+    """
+    return Positions.from_array(_fetch_horizons_vectors('-96', start, stop, step), "PSP")
+
+def fetch_psp_positions_at(dates, step='1h'):
+    """
+    Fetches PSP positions at arbitrary epochs with a single Horizons request.
+    
+    The trajectory is fetched at `step` cadence from the earliest to the
+    latest epoch and linearly interpolated to each of `dates`, so N epochs
+    cost one round trip instead of N. The request goes through the same
+    cache as fetch_psp_positions_horizons.
+    
+    Args:
+        dates: Sequence of epochs formatted as "%Y-%m-%d %H:%M".
+        step (str): Sampling cadence in minutes, hours or days ('10m', '1h',
+            '1d'); the interpolation error grows with it.
+    
+    Returns:
+        Positions with one entry per date, in the order given, in AU
+        relative to the Sun.
+    
+    Raises:
+        ValueError: If `step` is not a count of minutes, hours or days.
+    """
+    times = np.array([datetime.datetime.fromisoformat(date) for date in dates],
+                     dtype='datetime64[m]')
+    step, step_delta = _parse_step(step)
     
-    # Plot the Sun at the origin (0,0,0)
-    ax.scatter(0, 0, 0, color='yellow', s=200, label="Sun")
-    ax.text(0, 0, 0, "Sun", color='orange')
+    # Cover the latest epoch with a whole number of steps (at least one,
+    # since Horizons requires start < stop)
+    start = times.min()
+    n_steps = max(1, int(np.ceil((times.max() - start) / step_delta)))
+    stop = start + n_steps * step_delta
+    samples = _fetch_horizons_vectors('-96', str(start).replace('T', ' '),
+                                      str(stop).replace('T', ' '), step)
     
-    # Plot Earth (approximate position in AU; adjust as needed)
-    # For example, assuming Earth is at about (1, 0, 0) AU in heliocentric coordinates:
+    sample_times = np.arange(len(samples)) * (step_delta / np.timedelta64(1, 'm'))
+    elapsed = (times - start) / np.timedelta64(1, 'm')
+    return Positions(*(np.interp(elapsed, sample_times, samples[:, axis])
+                       for axis in range(3)),
+                     labels=["PSP"] * len(times))
+
+def _parse_step(step):
+    """
+    Validates a Horizons step size for interpolation.
+    
+    Returns:
+        Tuple (step, delta): the step in canonical form (e.g. '10m') and
+        its length as a numpy timedelta64 in minutes.
+    
+    Raises:
+        ValueError: For steps that are not a count of minutes, hours or days
+            (e.g. '1mo', '1y' or a bare number of intervals).
+    """
+    match = _STEP_PATTERN.fullmatch(step)
+    if match is None or int(match.group(1)) == 0:
+        raise ValueError(f"Unsupported step {step!r}: expected a number of minutes, "
+                         "hours or days such as '10m', '1h' or '1d'")
+    count, unit = int(match.group(1)), match.group(2)[0].lower()
+    return f"{count}{unit}", np.timedelta64(count, _STEP_UNITS[unit]).astype('timedelta64[m]')
+
+# Reconstructed trajectories of past epochs rarely change, but predicted
+# ones are refined as new orbit solutions are published
+@disk_cache("horizons", max_age=7 * 86400)
+def _fetch_horizons_vectors(body_id, start, stop, step):
+    """
+    Queries JPL Horizons for the heliocentric positions of a body.
+    
+    The Horizons API is called directly with CSV_FORMAT=YES and the rows
+    between the $$SOE/$$EOE markers are parsed with np.loadtxt (a C parser),
+    avoiding astroquery's pure-Python fixed-width table reader.
+    
+    Args:
+        body_id (str): Horizons id of the target body (e.g. '-96' for PSP).
+        start (str): First epoch, formatted as "%Y-%m-%d %H:%M".
+        stop (str): Last epoch, formatted as "%Y-%m-%d %H:%M".
+        step (str): Horizons step size.
+    
+    Returns:
+        Array of shape (N, 3) with x, y, z in AU relative to the Sun.
+    """
+    import requests
+    
+    params = dict(HORIZONS_VECTOR_PARAMS,
+                  COMMAND=f"'{body_id}'",
+                  START_TIME=f"'{start}'",
+                  STOP_TIME=f"'{stop}'",
+                  STEP_SIZE=f"'{step}'")
+    response = requests.get(HORIZONS_URL, params=params, timeout=30)
+    response.raise_for_status()
+    text = response.text
+    
+    begin, end = text.find("$$SOE"), text.find("$$EOE")
+    if begin < 0 or end < 0:
+        # Horizons reports query errors in the body, without the markers
+        raise ValueError(f"Unexpected Horizons response: {text.strip()[:500]}")
+    rows = text[begin + len("$$SOE"):end].strip().splitlines()
+    
+    # Rows are "JDTDB, Calendar Date (TDB), X, Y, Z,". The values stay in
+    # double precision; the plotting helpers cast to float32 at draw time
+    return np.loadtxt(rows, delimiter=',', usecols=(2, 3, 4), ndmin=2)
+
+def plot_positions(psp_pos, backend='matplotlib'):
+    """
+    Plots a 3D scatter plot of the PSP position along with the Sun and Earth.
+    
+    Args:
+        psp_pos: Positions of PSP in AU (a single sample or a trajectory).
+        backend (str): 'matplotlib', or 'vispy' for GPU rendering (falls back
+            to matplotlib when VisPy is not installed).
+    """
+    # PSP, the Sun at the origin (0,0,0) and Earth (approximate position in
+    # AU; adjust as needed). For example, assuming Earth is at about
+    # (1, 0, 0) AU in heliocentric coordinates:
     earth_pos = (1.0, 0.0, 0.0)
-    ax.scatter(earth_pos[0], earth_pos[1], earth_pos[2], color='blue', s=100, label="Earth")
-    ax.text(earth_pos[0], earth_pos[1], earth_pos[2], "Earth", color='blue')
+    bodies = Positions.concat(psp_pos,
+                              Positions.from_array([(0.0, 0.0, 0.0), earth_pos], ["Sun", "Earth"]))
+    colors = ['red'] * len(psp_pos) + ['yellow', 'blue']
+    sizes = [100] * len(psp_pos) + [200, 100]
+    
+    if backend == 'vispy' and plot_positions_vispy(bodies, colors, sizes):
+        return
+    
+    plt = pyplot()
+    fig = plt.figure()
+    ax = fig.add_subplot(111, projection='3d')
+    
+    scatter_bodies(ax, bodies, colors, sizes)
     
     # Label axes
     ax.set_xlabel("X (AU)")
     ax.set_ylabel("Y (AU)")
     ax.set_zlabel("Z (AU)")
-    
-    ax.legend()
     plt.title("Spacecraft Positions")
-    plt.show()
+    show_figure(fig, 'psp_positions.png')
 
-def analyze_psp(analysis_type):
+def analyze_psp(analysis_type, start=None, stop=None):
     """
     Analyze PSP data based on the specified analysis type.
     
     Args:
         analysis_type (str): Type of analysis to perform ('trajectory' or 'data_retrieval')
+        start (str): Epoch of the position ("%Y-%m-%d %H:%M"; default: now).
+        stop (str): If given, the hourly trajectory from start to stop is
+            fetched with a single Horizons request instead.
     """
     if analysis_type == "trajectory":
         try:
-            position = fetch_psp_position_horizons()
-            print(f"PSP Position (km): X={position[0]}, Y={position[1]}, Z={position[2]}")
+            if stop is not None:
+                positions = fetch_psp_positions_horizons(start, stop)
+                for x, y, z in positions.to_array():
+                    print(f"PSP Position (AU): X={x}, Y={y}, Z={z}")
+                return
+            position = fetch_psp_position_horizons(start)
+            print(f"PSP Position (AU): X={position.x[0]}, Y={position.y[0]}, Z={position.z[0]}")
         except Exception as e:
             print(f"Error getting PSP trajectory: {str(e)}")
     elif analysis_type == "data_retrieval":
@@ -83,7 +252,7 @@ def analyze_psp(analysis_type):
 def main():
     # Fetch PSP position from Horizons
     psp_position = fetch_psp_position_horizons()
-    print("PSP Position (AU relative to Sun):", psp_position)
+    print("PSP Position (AU relative to Sun):", psp_position.to_array()[0])
     
     # Plot PSP, Sun, and Earth positions in a 3D plot
     plot_positions(psp_position)
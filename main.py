@@ -1,3 +1,4 @@
+import argparse
 from jpl_approach_psp import analyze_psp
 from mms import analyze_mms
 from psp_plus_mms import analyze_psp_mms
@@ -56,29 +57,62 @@ def get_user_input():
     
     return spacecraft, analysis
 
+def parse_args(argv=None):
+    """
+    Parse command-line options.
+    
+    When neither --spacecraft nor --analysis is given the user is prompted
+    interactively; otherwise the run is fully scripted, e.g.
+    
+        python main.py --spacecraft mms --start "2024-02-01 00:00" --no-plot
+    """
+    parser = argparse.ArgumentParser(description="Spacecraft Trajectory Analyzer")
+    parser.add_argument("--spacecraft", choices=["psp", "mms", "psp+mms", "psp+mms+parker"],
+                        help="spacecraft to analyze")
+    parser.add_argument("--analysis", choices=["trajectory", "data_retrieval"],
+                        help="type of analysis (default: trajectory)")
+    parser.add_argument("--start",
+                        help='epoch / start of the time window, as "YYYY-MM-DD HH:MM" (UTC)')
+    parser.add_argument("--stop",
+                        help='end of the time window, as "YYYY-MM-DD HH:MM" (UTC)')
+    parser.add_argument("--plot", action=argparse.BooleanOptionalAction, default=True,
+                        help="plot the positions (use --no-plot to only print "
+                             "coordinates without loading matplotlib)")
+    args = parser.parse_args(argv)
+    if args.stop is not None and args.start is None:
+        parser.error("--stop requires --start")
+    return args
+
 def main():
+    args = parse_args()
+    interactive = args.spacecraft is None and args.analysis is None
     try:
-        # Get user input
-        spacecraft, analysis = get_user_input()
+        if interactive:
+            # Get user input
+            spacecraft, analysis = get_user_input()
+        else:
+            spacecraft = args.spacecraft or "psp"
+            analysis = args.analysis or "trajectory"
         
         print(f"\nAnalyzing {spacecraft} with {analysis} analysis...")
         
         # Call the appropriate function based on user input
         if spacecraft == "psp":
-            analyze_psp(analysis)
+            analyze_psp(analysis, start=args.start, stop=args.stop)
         elif spacecraft == "mms":
-            analyze_mms(analysis)
+            analyze_mms(analysis, plot=args.plot, start=args.start, stop=args.stop)
         elif spacecraft == "psp+mms":
-            analyze_psp_mms(analysis)
+            analyze_psp_mms(analysis, plot=args.plot, start=args.start, stop=args.stop)
         elif spacecraft == "psp+mms+parker":
-            analyze_psp_mms_parker(analysis)
+            analyze_psp_mms_parker(analysis, plot=args.plot, start=args.start, stop=args.stop)
             
     except KeyboardInterrupt:
         print("\nProgram terminated by user")
     except Exception as e:
         print(f"\nAn error occurred: {str(e)}")
     
-    input("\nPress Enter to exit...")
+    if interactive:
+        input("\nPress Enter to exit...")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
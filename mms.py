@@ -1,93 +1,205 @@
-from cdasws import CdasWs
+import asyncio
 import datetime
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D  # registers the 3D projection
+from _plot_backend import plot_positions_vispy, pyplot, scatter_bodies, show_figure
 import numpy as np
+import threading
+from _cache import disk_cache
+from positions import AU_km, Positions
 
-def fetch_mms_position(spacecraft_id="mms1"):
+# The four spacecraft of the MMS constellation, and their plot colors
+MMS_IDS = ("mms1", "mms2", "mms3", "mms4")
+MMS_COLORS = {"MMS": 'red', "MMS1": 'red', "MMS2": 'darkorange',
+              "MMS3": 'magenta', "MMS4": 'purple'}
+
+# Default CDAWeb time window, used when no start epoch is given
+DEFAULT_WINDOW = ("2024-02-01T00:00:00Z", "2024-02-01T01:00:00Z")
+
+# Shared CDAWeb client, created on first use (see _get_cdas)
+_CDAS = None
+_CDAS_LOCK = threading.Lock()
+
+def _get_cdas():
+    """
+    Returns the module-wide CdasWs client, creating it on first use.
+    
+    Reusing one client keeps its HTTP session (and the TCP/TLS connections
+    in its pool) alive across calls instead of reconnecting for every query.
+    cdasws is imported here, so that it is only loaded once CDAWeb is queried.
+    """
+    global _CDAS
+    with _CDAS_LOCK:
+        if _CDAS is None:
+            from cdasws import CdasWs
+            _CDAS = CdasWs()
+            session = getattr(_CDAS, '_session', None)
+            if session is not None and hasattr(session, 'mount'):
+                # Allow concurrent fetches (e.g. all four MMS spacecraft) to
+                # each keep a pooled connection
+                from requests.adapters import HTTPAdapter
+                adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+        return _CDAS
+
+def _cdaweb_window(start=None, stop=None):
+    """
+    Converts a (start, stop) pair of "%Y-%m-%d %H:%M" epochs to a CDAWeb window.
+    
+    Without a start epoch DEFAULT_WINDOW is used; without a stop epoch the
+    window spans one hour from the start.
+    
+    Returns:
+        Tuple (start_time, end_time) as ISO 8601 UTC strings.
+    """
+    if start is None:
+        return DEFAULT_WINDOW
+    start_dt = datetime.datetime.fromisoformat(start)
+    if stop is None:
+        stop_dt = start_dt + datetime.timedelta(hours=1)
+    else:
+        stop_dt = datetime.datetime.fromisoformat(stop)
+    return (start_dt.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            stop_dt.strftime("%Y-%m-%dT%H:%M:%SZ"))
+
+def fetch_mms_position(spacecraft_id="mms1", start=None, stop=None):
     """
     Fetches the MMS spacecraft position from CDAWeb.
     
+    Args:
+        spacecraft_id (str): Spacecraft to fetch ('mms1' to 'mms4').
+        start, stop (str): Optional time window, see fetch_mms_positions.
+    
     Returns:
-        A tuple (x, y, z) in kilometers in GSE coordinates.
+        Positions of length 1 in kilometers in GSE coordinates (first sample
+        of fetch_mms_positions), or None on failure.
     """
-    start_time = "2024-02-01T00:00:00Z"
-    end_time = "2024-02-01T01:00:00Z"
+    positions = fetch_mms_positions(spacecraft_id, start, stop)
+    if positions is None:
+        return None
+    return positions[:1]
+
+def fetch_mms_positions(spacecraft_id="mms1", start=None, stop=None):
+    """
+    Fetches the MMS spacecraft trajectory from CDAWeb.
     
-    print(f"Requesting MMS data from {start_time} to {end_time}")
+    Results are cached on disk (see _cache.disk_cache), so repeated calls for
+    the same time window do not hit the network.
+    
+    Args:
+        spacecraft_id (str): Spacecraft to fetch ('mms1' to 'mms4').
+        start (str): Start of the window, formatted as "%Y-%m-%d %H:%M"
+            (default: DEFAULT_WINDOW).
+        stop (str): End of the window (default: one hour after start).
+    
+    Returns:
+        Positions of length N (float64) in kilometers in GSE coordinates,
+        labelled with the spacecraft id, or None on failure.
+    """
+    start_time, end_time = _cdaweb_window(start, stop)
     
-    cdas = CdasWs()
+    positions = _fetch_mms_gse(spacecraft_id, start_time, end_time)
+    if positions is None:
+        return None
+    return Positions.from_array(positions, spacecraft_id.upper())
+
+def _mms_request(spacecraft_id, start_time, end_time):
+    """
+    Builds the CDAWeb request for the MMS GSE position over a time window.
+    
+    Returns:
+        Tuple (dataset, variables, start_time, end_time) as passed to
+        CdasWs.get_data; it is also the content hashed by the disk cache, so
+        byte-identical requests (e.g. 'mms1' and 'MMS1') share one entry.
+    """
     dataset = f"{spacecraft_id.upper()}_MEC_SRVY_L2_EPHT89D"
+    variables = [f"{spacecraft_id.lower()}_mec_r_gse"]
+    return dataset, variables, start_time, end_time
+
+@disk_cache("cdaweb", key=_mms_request, max_age=86400)
+def _fetch_mms_gse(spacecraft_id, start_time, end_time):
+    """
+    Queries CDAWeb for the MMS GSE position over a time window.
+    
+    Returns:
+        Array of shape (N, 3) in kilometers, or None on failure.
+    """
+    print(f"Requesting MMS data from {start_time} to {end_time}")
+    
+    cdas = _get_cdas()
+    dataset, variables, start_time, end_time = _mms_request(spacecraft_id, start_time, end_time)
+    variable = variables[0]
     
     try:
-        variables = ['mms1_mec_r_gse']
         res = cdas.get_data(dataset, variables, start_time, end_time)
         
-        # Debug print
-        print("Data received from CDAS:")
-        print(f"Response type: {type(res)}")
-        print(f"Response content: {res}")
-        
         if res is None or len(res) < 2:
             print(f"No data returned for {spacecraft_id}")
             return None
             
         data = res[1]
-        print(f"Data type: {type(data)}")
-        print(f"Data keys: {data.keys()}")
-        
-        if 'mms1_mec_r_gse' not in data:
+        if variable not in data:
             print("Position data not found in response")
             return None
-            
-        # Get raw position data
-        raw_position = data['mms1_mec_r_gse']
-        print(f"Position data type: {type(raw_position)}")
-        print(f"Position data: {raw_position}")
         
-        # Try to get the first position vector directly from the array
-        try:
-            # Convert to numpy array if it isn't already
-            position_array = np.array(raw_position)
-            first_position = position_array[0]
-            
-            # Ensure we have three components
-            if len(first_position) != 3:
-                print(f"Unexpected position format: {first_position}")
-                return None
-                
-            return (float(first_position[0]), 
-                    float(first_position[1]), 
-                    float(first_position[2]))
-                    
-        except Exception as e:
-            print(f"Error converting position data: {str(e)}")
-            # Fallback: try direct access
-            try:
-                return (float(raw_position[0][0]), 
-                        float(raw_position[0][1]), 
-                        float(raw_position[0][2]))
-            except Exception as e2:
-                print(f"Fallback access failed: {str(e2)}")
-                return None
+        positions = np.ascontiguousarray(data[variable].values, dtype=np.float64)
+        if positions.ndim != 2 or positions.shape[1] != 3 or len(positions) == 0:
+            print(f"Unexpected position format: shape {positions.shape}")
+            return None
+        return positions
                 
     except Exception as e:
         print(f"Error fetching MMS data: {str(e)}")
         return None
 
-def analyze_mms(analysis_type):
+async def fetch_all_mms(ids=MMS_IDS):
+    """
+    Fetches the positions of several MMS spacecraft concurrently.
+    
+    Each CDAWeb query runs in a worker thread, so the total latency is that
+    of the slowest query rather than the sum of all of them.
+    
+    Args:
+        ids: Spacecraft ids to fetch (default: all four MMS spacecraft).
+    
+    Returns:
+        List with one Positions in km (GSE) per id, or None for failed fetches.
+    """
+    return await asyncio.gather(*(asyncio.to_thread(fetch_mms_position, spacecraft_id)
+                                  for spacecraft_id in ids))
+
+def fetch_mms_constellation(ids=MMS_IDS):
+    """
+    Synchronous wrapper around fetch_all_mms.
+    
+    When called from a running event loop (e.g. a Jupyter notebook),
+    nest_asyncio is used so that asyncio.run can be re-entered.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        import nest_asyncio
+        nest_asyncio.apply()
+    return asyncio.run(fetch_all_mms(ids))
+
+def analyze_mms(analysis_type, plot=True, start=None, stop=None):
     """
     Analyze MMS data based on the specified analysis type.
     
     Args:
         analysis_type (str): Type of analysis to perform ('trajectory' or 'data_retrieval')
+        plot (bool): Whether to plot the positions; when False only the
+            coordinates are printed and matplotlib is never imported.
+        start, stop (str): Optional CDAWeb time window ("%Y-%m-%d %H:%M").
     """
     if analysis_type == "trajectory":
         try:
-            position = fetch_mms_position()
-            if position:
-                print(f"MMS Position (km): X={position[0]}, Y={position[1]}, Z={position[2]}")
-                plot_positions(position)
+            position = fetch_mms_position(start=start, stop=stop)
+            if position is not None:
+                print(f"MMS Position (km): X={position.x[0]}, Y={position.y[0]}, Z={position.z[0]}")
+                if plot:
+                    plot_positions(position)
             else:
                 print("Failed to get MMS position")
         except Exception as e:
@@ -97,32 +209,35 @@ def analyze_mms(analysis_type):
     else:
         print(f"Unknown analysis type: {analysis_type}")
 
-def plot_positions(mms_pos):
+def plot_positions(mms_pos, backend='matplotlib'):
     """
     Creates a 3D plot showing the MMS position, Earth, and the Sun in GSE.
     
     Args:
-        mms_pos: Tuple (x, y, z) for MMS position (in km).
+        mms_pos: Positions of one or more MMS spacecraft (in km).
+        backend (str): 'matplotlib', or 'vispy' for GPU rendering (falls back
+            to matplotlib when VisPy is not installed).
     """
     # Convert km to AU
-    AU = 149597870.7  # 1 AU in kilometers
-    mms_pos_au = (mms_pos[0]/AU, mms_pos[1]/AU, mms_pos[2]/AU)
+    mms_pos_au = mms_pos.scaled(1 / AU_km)
     
-    fig = plt.figure(figsize=(12, 12))  # Make the figure square
-    ax = fig.add_subplot(111, projection='3d')
+    # MMS (in red), Earth (origin in GSE) and the Sun in GSE: exactly 1 AU
+    # along the +X axis
+    sun_pos = (1, 0, 0)  # 1 AU
+    bodies = Positions.concat(mms_pos_au,
+                              Positions.from_array([(0.0, 0.0, 0.0), sun_pos], ["Earth", "Sun"]))
+    colors = [MMS_COLORS.get(label, 'red') for label in mms_pos_au.labels] + ['blue', 'yellow']
+    sizes = [100] * len(mms_pos_au) + [100, 200]
     
-    # Plot MMS position (in red)
-    ax.scatter(mms_pos_au[0], mms_pos_au[1], mms_pos_au[2], color='red', s=100, label="MMS")
-    ax.text(mms_pos_au[0], mms_pos_au[1], mms_pos_au[2], "MMS", color='red')
+    if backend == 'vispy' and plot_positions_vispy(bodies, colors, sizes,
+                                                   title="MMS Position in GSE (AU)"):
+        return
     
-    # Plot Earth (origin in GSE)
-    ax.scatter(0, 0, 0, color='blue', s=100, label="Earth")
-    ax.text(0, 0, 0, "Earth", color='blue')
+    plt = pyplot()
+    fig = plt.figure(figsize=(12, 12))  # Make the figure square
+    ax = fig.add_subplot(111, projection='3d')
     
-    # Plot the Sun in GSE: exactly 1 AU along the +X axis
-    sun_pos = (1, 0, 0)  # 1 AU
-    ax.scatter(sun_pos[0], sun_pos[1], sun_pos[2], color='yellow', s=200, label="Sun")
-    ax.text(sun_pos[0], sun_pos[1], sun_pos[2], "Sun", color='orange')
+    scatter_bodies(ax, bodies, colors, sizes)
     
     # Set equal aspect ratio for all axes
     ax.set_box_aspect([1, 1, 1])
@@ -136,19 +251,20 @@ def plot_positions(mms_pos):
     ax.set_xlabel("X (AU)")
     ax.set_ylabel("Y (AU)")
     ax.set_zlabel("Z (AU)")
-    ax.legend()
     plt.title("MMS Position in GSE (AU)")
     
     # Add a grid for better spatial reference
     ax.grid(True)
     
-    plt.show()
+    show_figure(fig, 'mms_positions.png')
 
 def main():
-    mms_position = fetch_mms_position("mms1")
-    if mms_position:
-        print("MMS1 position (GSE, km):", mms_position)
-        plot_positions(mms_position)
+    # Fetch all four spacecraft concurrently
+    found = [position for position in fetch_mms_constellation() if position is not None]
+    for position in found:
+        print(f"{position.labels[0]} position (GSE, km):", position.to_array()[0])
+    if found:
+        plot_positions(Positions.concat(*found))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,87 @@
+from dataclasses import dataclass, field
+import numbers
+import numpy as np
+
+AU_km = 149597870.7  # 1 AU in kilometers
+
+# Earth is assumed to sit at (1, 0, 0) AU in heliocentric coordinates
+EARTH_HELIOCENTRIC = (1.0, 0.0, 0.0)
+
+@dataclass
+class Positions:
+    """
+    Positions of one or more bodies, stored as a structure of arrays.
+
+    Each coordinate axis is kept as its own 1-D array, so unit conversions and
+    frame shifts are whole-array NumPy operations instead of per-body loops,
+    and the arrays can be handed straight to ax.scatter. A single position is
+    simply a Positions of length 1; a trajectory has one entry per sample.
+
+    The transformation methods return new objects rather than modifying the
+    arrays in place, since fetched arrays may be shared with the fetch cache.
+
+    Attributes:
+        x, y, z: 1-D arrays of equal length N.
+        labels: List of N body names (repeated along a trajectory).
+    """
+    x: np.ndarray
+    y: np.ndarray
+    z: np.ndarray
+    labels: list = field(default_factory=list)
+
+    @classmethod
+    def from_array(cls, array, labels):
+        """
+        Builds a Positions from an array of shape (3,) or (N, 3).
+
+        Args:
+            array: Positions as rows of (x, y, z).
+            labels: Either one name per row, or a single name for all rows.
+        """
+        array = np.asarray(array).reshape(-1, 3)
+        if isinstance(labels, str):
+            labels = [labels] * len(array)
+        return cls(np.ascontiguousarray(array[:, 0]),
+                   np.ascontiguousarray(array[:, 1]),
+                   np.ascontiguousarray(array[:, 2]),
+                   list(labels))
+
+    @classmethod
+    def concat(cls, *positions):
+        """Joins several Positions into one, preserving their order."""
+        return cls(np.concatenate([p.x for p in positions]),
+                   np.concatenate([p.y for p in positions]),
+                   np.concatenate([p.z for p in positions]),
+                   [label for p in positions for label in p.labels])
+
+    def __len__(self):
+        return len(self.x)
+
+    def __getitem__(self, index):
+        """Selects a subset of the bodies/samples with a slice or index array."""
+        if isinstance(index, numbers.Integral):
+            index = slice(index, index + 1 or None)
+        labels = np.asarray(self.labels, dtype=object)[index]
+        return Positions(self.x[index], self.y[index], self.z[index], list(labels))
+
+    def scaled(self, factor):
+        """Returns the positions multiplied by `factor` (e.g. 1/AU to convert km to AU)."""
+        return Positions(self.x * factor, self.y * factor, self.z * factor, list(self.labels))
+
+    def shifted(self, dx=0.0, dy=0.0, dz=0.0):
+        """Returns the positions translated by (dx, dy, dz) (e.g. to move the origin)."""
+        return Positions(self.x + dx, self.y + dy, self.z + dz, list(self.labels))
+
+    def to_array(self):
+        """Returns the positions as an (N, 3) array of (x, y, z) rows."""
+        return np.column_stack((self.x, self.y, self.z))
+
+def gse_to_heliocentric(positions):
+    """
+    Converts Earth-centered GSE positions (in km) to heliocentric AU.
+
+    The positions are scaled to AU and shifted by EARTH_HELIOCENTRIC, one
+    operation per coordinate array, so a single sample and a full trajectory
+    cost the same number of calls.
+    """
+    return positions.scaled(1 / AU_km).shifted(*EARTH_HELIOCENTRIC)
@@ -1,81 +1,27 @@
-from astroquery.jplhorizons import Horizons
-from cdasws import CdasWs
-import datetime
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D  # registers the 3D projection
+import asyncio
+from _plot_backend import pyplot, scatter_bodies, show_figure
 from jpl_approach_psp import fetch_psp_position_horizons
-from mms import fetch_mms_position, plot_positions
+from mms import fetch_mms_position
+from positions import AU_km, EARTH_HELIOCENTRIC, Positions, gse_to_heliocentric
 
-# ----------------------------
-# PSP functions (Heliocentric, in AU)
-# ----------------------------
-def fetch_psp_position_horizons(date=None):
+async def _gather_positions(start=None, stop=None):
     """
-    Fetches the Parker Solar Probe (PSP) position from JPL Horizons.
+    Fetches the PSP and MMS positions concurrently.
     
-    Returns:
-        Tuple (x, y, z) in AU relative to the Sun.
-    """
-    # Use a timezone-aware current time in UTC if no date is provided
-    if date is None:
-        date = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d %H:%M")
-    
-    # Create a 1-minute time window (to avoid "start must be earlier than stop" errors)
-    start_time = date
-    stop_time = (datetime.datetime.strptime(date, "%Y-%m-%d %H:%M") +
-                 datetime.timedelta(minutes=1)).strftime("%Y-%m-%d %H:%M")
-    
-    psp = Horizons(id='-96', 
-                   location='@sun',
-                   epochs={'start': start_time, 'stop': stop_time, 'step': '1m'})
-    vectors = psp.vectors()
-    x = float(vectors['x'][0])
-    y = float(vectors['y'][0])
-    z = float(vectors['z'][0])
-    return x, y, z
-
-# ----------------------------
-# MMS functions (GSE in km relative to Earth)
-# ----------------------------
-def fetch_mms_position(spacecraft_id="mms1"):
-    """
-    Fetches the MMS spacecraft position from CDAWeb.
+    Both queries are independent blocking network round-trips, so each one
+    runs in a worker thread and the total latency is that of the slower one.
+    
+    Args:
+        start (str): PSP epoch and start of the MMS window ("%Y-%m-%d %H:%M").
+        stop (str): End of the MMS window.
     
     Returns:
-        A tuple (x, y, z) in kilometers in GSE coordinates (Earth at origin).
+        Tuple (psp_pos, mms_pos) as returned by the individual fetch functions.
     """
-    # For demonstration, we use a fixed time window (update as needed)
-    start_time = "2024-02-01T00:00:00Z"
-    end_time = "2024-02-01T01:00:00Z"
-    
-    print(f"Requesting MMS data from {start_time} to {end_time}")
-    
-    cdas = CdasWs()
-    # Dataset name for MMS (this may need to be updated based on current CDAWeb datasets)
-    dataset = f"{spacecraft_id.upper()}_MEC_SRVY_L2_EPHT89D"
-    
-    try:
-        variables = ['mms1_mec_r_gse']
-        print(f"Requesting dataset: {dataset}")
-        res = cdas.get_data(dataset, variables, start_time, end_time)
-        if res is None:
-            print(f"No data returned for {spacecraft_id}")
-            return None
-            
-        # Extract the data (assuming the result is an xarray Dataset)
-        data = res[1]
-        if 'mms1_mec_r_gse' not in data:
-            print("Position data not found in response")
-            return None
-            
-        # Get the first position vector (x, y, z)
-        position = data['mms1_mec_r_gse'].values[0]
-        x, y, z = position
-        return float(x), float(y), float(z)
-        
-    except Exception as e:
-        print(f"Error fetching MMS data: {str(e)}")
-        return None
+    return await asyncio.gather(
+        asyncio.to_thread(fetch_psp_position_horizons, start),
+        asyncio.to_thread(fetch_mms_position, "mms1", start, stop),
+    )
 
 # ----------------------------
 # Combined Plotting Function
@@ -89,89 +35,67 @@ def plot_spacecraft_positions(psp_pos, mms_pos):
       1. Convert from km to AU.
       2. Add Earth's heliocentric offset (assumed to be at (1, 0, 0) AU).
     """
-    AU_km = 149597870.7  # 1 AU in kilometers
-    
-    # Convert MMS position from km to AU (still Earth-centered)
-    mms_pos_au_rel = (mms_pos[0] / AU_km, mms_pos[1] / AU_km, mms_pos[2] / AU_km)
-    
-    # Assume Earth is at (1, 0, 0) AU in heliocentric coordinates.
-    earth_heliocentric = (1.0, 0.0, 0.0)
-    
-    # Estimate MMS heliocentric position by adding Earth's offset.
-    mms_heliocentric = (
-        earth_heliocentric[0] + mms_pos_au_rel[0],
-        earth_heliocentric[1] + mms_pos_au_rel[1],
-        earth_heliocentric[2] + mms_pos_au_rel[2]
-    )
+    mms_heliocentric = gse_to_heliocentric(mms_pos)
     
     # Create the 3D plot
+    plt = pyplot()
     fig = plt.figure(figsize=(10, 8))
     ax = fig.add_subplot(111, projection='3d')
     
-    # Plot PSP (in red)
-    ax.scatter(psp_pos[0], psp_pos[1], psp_pos[2], color='red', s=100, label="PSP")
-    ax.text(psp_pos[0], psp_pos[1], psp_pos[2], "PSP", color='red')
-    
-    # Plot MMS (in green)
-    ax.scatter(mms_heliocentric[0], mms_heliocentric[1], mms_heliocentric[2],
-               color='green', s=100, label="MMS")
-    ax.text(mms_heliocentric[0], mms_heliocentric[1], mms_heliocentric[2],
-            "MMS", color='green')
-    
-    # Plot the Sun at the origin
-    ax.scatter(0, 0, 0, color='yellow', s=200, label="Sun")
-    ax.text(0, 0, 0, "Sun", color='orange')
-    
-    # Plot Earth (assumed at (1, 0, 0) AU)
-    ax.scatter(earth_heliocentric[0], earth_heliocentric[1], earth_heliocentric[2],
-               color='blue', s=100, label="Earth")
-    ax.text(earth_heliocentric[0], earth_heliocentric[1], earth_heliocentric[2],
-            "Earth", color='blue')
+    # Plot PSP (in red), MMS (in green), the Sun at the origin and Earth
+    # (assumed at (1, 0, 0) AU)
+    bodies = Positions.concat(psp_pos, mms_heliocentric,
+                              Positions.from_array([(0.0, 0.0, 0.0), EARTH_HELIOCENTRIC],
+                                                   ["Sun", "Earth"]))
+    scatter_bodies(ax, bodies,
+                   colors=['red'] * len(psp_pos) + ['green'] * len(mms_heliocentric) + ['yellow', 'blue'],
+                   sizes=[100] * len(psp_pos) + [100] * len(mms_heliocentric) + [200, 100])
     
     # Label axes and set title
     ax.set_xlabel("X (AU)")
     ax.set_ylabel("Y (AU)")
     ax.set_zlabel("Z (AU)")
-    ax.legend()
     plt.title("PSP & MMS Positions (Heliocentric, in AU)")
     
-    plt.show()
+    show_figure(fig, 'psp_mms_heliocentric.png')
 
 # ----------------------------
 # Main Execution
 # ----------------------------
 def main():
-    # Fetch PSP position (already in AU relative to the Sun)
-    psp_position = fetch_psp_position_horizons()
-    print("PSP Position (AU relative to Sun):", psp_position)
+    # Fetch PSP (AU relative to the Sun) and MMS (km relative to Earth, GSE)
+    # positions concurrently
+    psp_position, mms_position = asyncio.run(_gather_positions())
+    print("PSP Position (AU relative to Sun):", psp_position.to_array()[0])
     
-    # Fetch MMS position (in km relative to Earth, GSE)
-    mms_position = fetch_mms_position("mms1")
     if mms_position is None:
         print("Could not retrieve MMS position.")
         return
-    print("MMS Position (km relative to Earth, GSE):", mms_position)
+    print("MMS Position (km relative to Earth, GSE):", mms_position.to_array()[0])
     
     # Plot both spacecraft positions in heliocentric coordinates (AU)
     plot_spacecraft_positions(psp_position, mms_position)
 
-def analyze_psp_mms(analysis_type):
+def analyze_psp_mms(analysis_type, plot=True, start=None, stop=None):
     """
     Analyze both PSP and MMS data based on the specified analysis type.
     
     Args:
         analysis_type (str): Type of analysis to perform ('trajectory' or 'data_retrieval')
+        plot (bool): Whether to plot the positions; when False only the
+            coordinates are printed and matplotlib is never imported.
+        start, stop (str): Optional epoch/time window ("%Y-%m-%d %H:%M").
     """
     if analysis_type == "trajectory":
         try:
-            # Get positions for both spacecraft
-            psp_pos = fetch_psp_position_horizons()
-            mms_pos = fetch_mms_position()
+            # Get positions for both spacecraft concurrently
+            psp_pos, mms_pos = asyncio.run(_gather_positions(start, stop))
             
-            if psp_pos and mms_pos:
-                print(f"PSP Position (km): X={psp_pos[0]}, Y={psp_pos[1]}, Z={psp_pos[2]}")
-                print(f"MMS Position (km): X={mms_pos[0]}, Y={mms_pos[1]}, Z={mms_pos[2]}")
-                plot_both_positions(psp_pos, mms_pos)
+            if psp_pos is not None and mms_pos is not None:
+                print(f"PSP Position (AU): X={psp_pos.x[0]}, Y={psp_pos.y[0]}, Z={psp_pos.z[0]}")
+                print(f"MMS Position (km): X={mms_pos.x[0]}, Y={mms_pos.y[0]}, Z={mms_pos.z[0]}")
+                if plot:
+                    plot_both_positions(psp_pos, mms_pos)
             else:
                 print("Failed to get positions for one or both spacecraft")
                 
@@ -188,33 +112,25 @@ def plot_both_positions(psp_pos, mms_pos):
     Creates a 3D plot showing both PSP and MMS positions, Earth, and the Sun in GSE.
     
     Args:
-        psp_pos: Tuple (x, y, z) for PSP position (in km)
-        mms_pos: Tuple (x, y, z) for MMS position (in km)
+        psp_pos: Positions of PSP (in km)
+        mms_pos: Positions of MMS (in km)
     """
     # Convert km to AU
-    AU = 149597870.7  # 1 AU in kilometers
-    psp_pos_au = (psp_pos[0]/AU, psp_pos[1]/AU, psp_pos[2]/AU)
-    mms_pos_au = (mms_pos[0]/AU, mms_pos[1]/AU, mms_pos[2]/AU)
+    psp_pos_au = psp_pos.scaled(1 / AU_km)
+    mms_pos_au = mms_pos.scaled(1 / AU_km)
     
+    plt = pyplot()
     fig = plt.figure(figsize=(12, 12))
     ax = fig.add_subplot(111, projection='3d')
     
-    # Plot PSP position (in purple)
-    ax.scatter(psp_pos_au[0], psp_pos_au[1], psp_pos_au[2], color='purple', s=100, label="PSP")
-    ax.text(psp_pos_au[0], psp_pos_au[1], psp_pos_au[2], "PSP", color='purple')
-    
-    # Plot MMS position (in red)
-    ax.scatter(mms_pos_au[0], mms_pos_au[1], mms_pos_au[2], color='red', s=100, label="MMS")
-    ax.text(mms_pos_au[0], mms_pos_au[1], mms_pos_au[2], "MMS", color='red')
-    
-    # Plot Earth (origin in GSE)
-    ax.scatter(0, 0, 0, color='blue', s=100, label="Earth")
-    ax.text(0, 0, 0, "Earth", color='blue')
-    
-    # Plot the Sun in GSE: exactly 1 AU along the +X axis
+    # Plot PSP (in purple), MMS (in red), Earth (origin in GSE) and the Sun
+    # in GSE: exactly 1 AU along the +X axis
     sun_pos = (1, 0, 0)  # 1 AU
-    ax.scatter(sun_pos[0], sun_pos[1], sun_pos[2], color='yellow', s=200, label="Sun")
-    ax.text(sun_pos[0], sun_pos[1], sun_pos[2], "Sun", color='orange')
+    bodies = Positions.concat(psp_pos_au, mms_pos_au,
+                              Positions.from_array([(0, 0, 0), sun_pos], ["Earth", "Sun"]))
+    scatter_bodies(ax, bodies,
+                   colors=['purple'] * len(psp_pos_au) + ['red'] * len(mms_pos_au) + ['blue', 'yellow'],
+                   sizes=[100] * len(psp_pos_au) + [100] * len(mms_pos_au) + [100, 200])
     
     ax.set_box_aspect([1, 1, 1])
     
@@ -226,11 +142,10 @@ def plot_both_positions(psp_pos, mms_pos):
     ax.set_xlabel("X (AU)")
     ax.set_ylabel("Y (AU)")
     ax.set_zlabel("Z (AU)")
-    ax.legend()
     plt.title("PSP and MMS Positions in GSE (AU)")
     
     ax.grid(True)
-    plt.show()
+    show_figure(fig, 'psp_mms_gse.png')
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
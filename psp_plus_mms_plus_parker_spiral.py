@@ -1,12 +1,21 @@
+import argparse
 import numpy as np
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D  # Enables 3D plotting
-import matplotlib.colors as colors
-import datetime
-from astroquery.jplhorizons import Horizons
-from cdasws import CdasWs
-from jpl_approach_psp import fetch_psp_position_horizons
-from mms import fetch_mms_position
+from _plot_backend import plot_positions_pyvista, plot_surface_quads, pyplot, scatter_bodies
+import asyncio
+import functools
+import math
+import sys
+from psp_plus_mms import _gather_positions
+from positions import AU_km, EARTH_HELIOCENTRIC, Positions, gse_to_heliocentric
+
+# Spiral parameters of main(): (option name, prompt, default)
+SPIRAL_PARAMETERS = (
+    ("tilt", "Tilt angle (deg)", 10.0),
+    ("amp", "Undulation amplitude (deg)", 15.0),
+    ("solar_rot", "Solar rotation period (days)", 25.4),
+    ("v_sw", "Solar wind speed (km/s)", 400.0),
+    ("r_max", "Radial extent (AU)", 1.5),
+)
 
 def get_input(prompt, default):
     """
@@ -21,102 +30,155 @@ def get_input(prompt, default):
         print(f"Invalid input. Using default value: {default}")
         return default
 
+@functools.lru_cache(maxsize=8)
 def compute_parker_spiral_surface(r_min=0.1, r_max=1.5, n_r=100, n_phi=100,
                                   tilt_deg=10.0, amp_deg=15.0,
                                   solar_rot_days=25.4, v_sw_km_s=400.0):
     """
     Computes a 3D surface approximating the warped heliospheric current sheet.
-    """
-    AU_km = 1.4959787e8  # km per AU
     
-    # Convert angles to radians
-    tilt = np.radians(tilt_deg)
-    amp = np.radians(amp_deg)
+    The grid is never materialized: r is a (1, n_r) row and phi a (n_phi, 1)
+    column, so terms depending on only one of them stay 1-D and broadcasting
+    produces the (n_phi, n_r) outputs directly.
+    
+    The grid is float32, which is ample for display, halves the memory
+    traffic of every pass and matches what matplotlib renders with; scalar
+    parameters are derived in double precision first.
+    
+    With Numba installed the whole computation runs in one compiled kernel
+    (see _compiled_spiral_kernel) instead. Call it from the main thread: the
+    kernel starts a parallel Numba region, which must not be launched from
+    a worker thread such as asyncio.to_thread.
+    
+    Results are memoized on the parameters, so replotting with the same
+    spiral reuses the arrays; they are returned read-only since every caller
+    shares them.
+    
+    Returns:
+      (x, y, z, B) float32 arrays of shape (n_phi, n_r).
+    """
+    # Convert angles to radians (as Python floats, so that they do not
+    # promote the float32 arrays below)
+    tilt = float(np.radians(tilt_deg))
+    amp = float(np.radians(amp_deg))
     
     # Compute spiral winding parameter
     omega = 2 * np.pi / solar_rot_days  # rad/day
     v_sw_AU_day = (v_sw_km_s * 86400) / AU_km  # solar wind speed in AU/day
     alpha = omega / v_sw_AU_day  # winding rate (rad/AU)
     
-    # Create grid in r and phi
-    r_vals = np.linspace(r_min, r_max, n_r)
-    phi_vals = np.linspace(0, 2 * np.pi, n_phi)
-    R, Phi = np.meshgrid(r_vals, phi_vals)
+    # Normalization of the magnetic field strength
+    B0_norm = 1 / math.sqrt(1 + (omega / v_sw_AU_day)**2 * (math.cos(tilt))**2)
     
-    # Define polar angle theta with sinusoidal undulation
+    r_vals = np.linspace(r_min, r_max, n_r, dtype=np.float32)
+    phi_vals = np.linspace(0, 2 * np.pi, n_phi, dtype=np.float32)
+    
+    kernel = _compiled_spiral_kernel()
+    if kernel is not None:
+        # Scalars are passed as float32 too, so the kernel runs in single
+        # precision throughout
+        scalars = (r_min, np.pi / 2 - tilt, amp, alpha, omega / v_sw_AU_day, B0_norm)
+        surface = kernel(r_vals, phi_vals, *map(np.float32, scalars))
+        for array in surface:
+            array.setflags(write=False)
+        return surface
+    
+    # Open grid in r (row) and phi (column)
+    R = r_vals[np.newaxis, :]
+    Phi = phi_vals[:, np.newaxis]
+    
+    # Define polar angle theta with sinusoidal undulation (depends on phi only)
     theta = (np.pi / 2 - tilt) + amp * np.sin(2 * Phi)
     
     # Add spiral twist
     Phi_spiral = Phi + alpha * (R - r_min)
     
+    # Each trigonometric term is evaluated once; those of theta are (n_phi, 1)
+    sin_t = np.sin(theta)
+    cos_t = np.cos(theta)
+    sin_p = np.sin(Phi_spiral)
+    cos_p = np.cos(Phi_spiral)
+    
     # Convert to Cartesian coordinates
-    x = R * np.sin(theta) * np.cos(Phi_spiral)
-    y = R * np.sin(theta) * np.sin(Phi_spiral)
-    z = R * np.cos(theta)
+    R_sin_t = R * sin_t
+    x = R_sin_t * cos_p
+    y = R_sin_t * sin_p
+    z = R * cos_t
     
     # Calculate normalized magnetic field strength
-    B0_norm = 1 / np.sqrt(1 + (omega / v_sw_AU_day)**2 * (np.cos(tilt))**2)
-    B = B0_norm * (1 / R)**2 * np.sqrt(1 + (omega * R / v_sw_AU_day)**2 * (np.sin(theta))**2)
+    B = _field_strength(B0_norm, R, omega / v_sw_AU_day, sin_t)
     
+    for array in (x, y, z, B):
+        array.setflags(write=False)
     return x, y, z, B
 
-def fetch_psp_position_horizons(date=None):
+@functools.lru_cache(maxsize=None)
+def _compiled_spiral_kernel():
     """
-    Fetch PSP position from JPL Horizons in heliocentric coordinates (AU).
+    Returns the Numba-compiled surface kernel, or None without Numba.
     
-    Returns:
-      (x, y, z) in AU relative to the Sun.
+    The kernel evaluates x, y, z and B point by point in a single pass over
+    the output arrays, parallelized over phi, so no intermediate grid-sized
+    arrays are allocated. It is compiled on first use and cached on disk.
     """
-    if date is None:
-        date = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d %H:%M")
-    
-    # Use a 1-minute time window to avoid errors
-    start_time = date
-    stop_time = (datetime.datetime.strptime(date, "%Y-%m-%d %H:%M") +
-                 datetime.timedelta(minutes=1)).strftime("%Y-%m-%d %H:%M")
-    
-    psp = Horizons(id='-96', location='@sun',
-                   epochs={'start': start_time, 'stop': stop_time, 'step': '1m'})
-    vectors = psp.vectors()
-    x = float(vectors['x'][0])
-    y = float(vectors['y'][0])
-    z = float(vectors['z'][0])
-    return (x, y, z)
+    try:
+        import numba
+    except ImportError:
+        return None
+    
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def kernel(r_vals, phi_vals, r_min, theta0, amp, alpha, k, B0_norm):
+        n_phi, n_r = len(phi_vals), len(r_vals)
+        x = np.empty((n_phi, n_r), dtype=r_vals.dtype)
+        y = np.empty_like(x)
+        z = np.empty_like(x)
+        B = np.empty_like(x)
+        # Integer and float64 literals would promote the arithmetic to
+        # double precision, so the only constant is a float32 one
+        one = np.float32(1)
+        for i in numba.prange(n_phi):
+            phi = phi_vals[i]
+            theta = theta0 + amp * np.sin(phi + phi)
+            sin_t = np.sin(theta)
+            cos_t = np.cos(theta)
+            for j in range(n_r):
+                r = r_vals[j]
+                phi_spiral = phi + alpha * (r - r_min)
+                x[i, j] = r * sin_t * np.cos(phi_spiral)
+                y[i, j] = r * sin_t * np.sin(phi_spiral)
+                z[i, j] = r * cos_t
+                k_r_sin_t = k * r * sin_t
+                B[i, j] = B0_norm / (r * r) * np.sqrt(one + k_r_sin_t * k_r_sin_t)
+        return x, y, z, B
+    
+    return kernel
 
-def fetch_mms_position(spacecraft_id="mms1"):
+def _field_strength(B0_norm, R, k, sin_t):
     """
-    Fetch MMS position from CDAWeb in GSE coordinates (km) relative to Earth.
-    
-    Returns:
-      (x, y, z) in km.
+    Evaluates B = B0_norm / R^2 * sqrt(1 + (k * R * sin_t)^2) on the grid.
+    
+    The factors depending on r only (B0_norm / R^2 and k * R) are computed
+    once on the radial axis, leaving a multiply and a hypot per grid point:
+    np.hypot(1, a) computes sqrt(1 + a^2) in one accurate libm call instead
+    of separate square, add and sqrt passes.
+    
+    With numexpr installed the expression is evaluated in one multithreaded,
+    cache-blocked pass without the intermediate (n_phi, n_r) arrays NumPy
+    allocates for each operation (numexpr has no hypot, so the square root
+    form is used there); otherwise NumPy is used, updating one grid-sized
+    array in place.
     """
-    # For demonstration, use a fixed time window (update as needed)
-    start_time = "2024-02-01T00:00:00Z"
-    end_time   = "2024-02-01T01:00:00Z"
-    
-    print(f"Requesting MMS data from {start_time} to {end_time}")
-    
-    cdas = CdasWs()
-    dataset = f"{spacecraft_id.upper()}_MEC_SRVY_L2_EPHT89D"
-    variables = ['mms1_mec_r_gse']
-    
+    scale = B0_norm / (R * R)
+    kR = k * R
     try:
-        res = cdas.get_data(dataset, variables, start_time, end_time)
-        if res is None:
-            print(f"No data returned for {spacecraft_id}")
-            return None
-        data = res[1]
-        if 'mms1_mec_r_gse' not in data:
-            print("Position data not found in response.")
-            return None
-        
-        # Use the first position vector
-        position = data['mms1_mec_r_gse'].values[0]
-        x, y, z = position
-        return (float(x), float(y), float(z))
-    except Exception as e:
-        print(f"Error fetching MMS data: {str(e)}")
-        return None
+        import numexpr
+    except ImportError:
+        B = kR * sin_t
+        np.hypot(1, B, out=B)
+        B *= scale
+        return B
+    return numexpr.evaluate("scale * sqrt(1 + (kR * sin_t) ** 2)",
+                            local_dict={'scale': scale, 'kR': kR, 'sin_t': sin_t})
 
 def calculate_parker_spiral(r_range, theta_range, omega=2.7e-6, v_sw=400):
     """
@@ -129,12 +191,16 @@ def calculate_parker_spiral(r_range, theta_range, omega=2.7e-6, v_sw=400):
         v_sw: Solar wind speed (km/s)
     
     Returns:
-        x, y, z coordinates of the spiral surface
+        x, y, z coordinates of the spiral surface, of shape
+        (len(theta_range), len(r_range)). z depends on r only and is a
+        read-only broadcast view of a single row.
     """
-    r, theta = np.meshgrid(r_range, theta_range)
+    # Open grid: r is a (1, N_r) row and theta a (N_theta, 1) column
+    r = np.asarray(r_range)[np.newaxis, :]
+    theta = np.asarray(theta_range)[:, np.newaxis]
     
     # Calculate phi (azimuthal angle) for Parker Spiral
-    phi = -omega * (r * 149597870.7) / v_sw  # Convert AU to km for calculation
+    phi = -omega * (r * AU_km) / v_sw  # Convert AU to km for calculation
     
     # Create ripple-like wave pattern
     wave_number = 4  # Number of wave peaks
@@ -145,32 +211,33 @@ def calculate_parker_spiral(r_range, theta_range, omega=2.7e-6, v_sw=400):
     # Convert to cartesian coordinates
     x = r * np.cos(theta)
     y = r * np.sin(theta)
-    z = z_wave
+    z = np.broadcast_to(z_wave, x.shape)
     
     return x, y, z
 
-def analyze_psp_mms_parker(analysis_type):
+def analyze_psp_mms_parker(analysis_type, plot=True, start=None, stop=None):
     """
     Analyze PSP and MMS data with Parker Spiral, based on the specified analysis type.
+    
+    When `plot` is False only the coordinates are printed and matplotlib is
+    never imported. `start`/`stop` optionally set the PSP epoch and MMS time
+    window ("%Y-%m-%d %H:%M").
     """
     if analysis_type == "trajectory":
         try:
-            # Get spacecraft positions
-            psp_pos = fetch_psp_position_horizons()
-            mms_pos = fetch_mms_position()
+            # Get spacecraft positions concurrently
+            psp_pos, mms_pos = asyncio.run(_gather_positions(start, stop))
             
-            if psp_pos and mms_pos:
-                print(f"PSP Position (AU): X={psp_pos[0]}, Y={psp_pos[1]}, Z={psp_pos[2]}")
+            if psp_pos is not None and mms_pos is not None:
+                print(f"PSP Position (AU): X={psp_pos.x[0]}, Y={psp_pos.y[0]}, Z={psp_pos.z[0]}")
                 
-                # Convert MMS position from km to AU
-                AU_km = 1.4959787e8
-                mms_pos_au = tuple(coord/AU_km for coord in mms_pos)
-                # Shift MMS position to heliocentric coordinates
-                mms_helio = (1.0 + mms_pos_au[0], mms_pos_au[1], mms_pos_au[2])
+                # Convert MMS position from km to heliocentric AU
+                mms_helio = gse_to_heliocentric(mms_pos)
                 
-                print(f"MMS Position (AU): X={mms_helio[0]}, Y={mms_helio[1]}, Z={mms_helio[2]}")
+                print(f"MMS Position (AU): X={mms_helio.x[0]}, Y={mms_helio.y[0]}, Z={mms_helio.z[0]}")
                 
-                plot_positions_with_parker(psp_pos, mms_helio)
+                if plot:
+                    plot_positions_with_parker(psp_pos, mms_helio)
             else:
                 print("Failed to get positions for one or both spacecraft")
                 
@@ -182,28 +249,61 @@ def analyze_psp_mms_parker(analysis_type):
     else:
         print(f"Unknown analysis type: {analysis_type}")
 
-def plot_positions_with_parker(psp_pos, mms_pos):
+def plot_positions_with_parker(psp_pos, mms_pos, surface=None, backend='matplotlib',
+                               filename='plot_with_parker_spiral.png'):
     """
     Creates a 3D plot showing PSP, MMS, Parker Spiral surface, Earth, and the Sun.
+    
+    Args:
+      psp_pos: Positions of PSP in AU relative to the Sun.
+      mms_pos: Positions of MMS in heliocentric AU.
+      surface: Precomputed (x, y, z, B) from compute_parker_spiral_surface;
+        the default spiral is computed when omitted.
+      backend (str): 'matplotlib', or 'pyvista' for GPU rendering (falls back
+        to matplotlib when PyVista is not installed).
+      filename (str): Path of the saved PNG.
     """
+    # Compute Parker Spiral surface unless the caller already has it
+    if surface is None:
+        surface = compute_parker_spiral_surface()
+    x_spiral, y_spiral, z_spiral, B = surface
+    
+    # Sun at origin, Earth at (1,0,0) AU, PSP and MMS
+    bodies = Positions.concat(
+        Positions.from_array([(0.0, 0.0, 0.0), EARTH_HELIOCENTRIC], ["Sun", "Earth"]),
+        psp_pos, mms_pos)
+    body_colors = ['yellow', 'blue'] + ['red'] * len(psp_pos) + ['green'] * len(mms_pos)
+    body_sizes = [200, 100] + [100] * len(psp_pos) + [100] * len(mms_pos)
+    
+    if backend == 'pyvista' and plot_positions_pyvista(
+            bodies, body_colors, body_sizes, surface=surface,
+            filename=filename,
+            title="Heliospheric Current Sheet with Parker Spiral"):
+        return
+    
+    plt = pyplot()
+    import matplotlib.colors as colors
+    
     fig = plt.figure(figsize=(12, 10))
     ax = fig.add_subplot(111, projection='3d')
     
-    # Compute Parker Spiral surface
-    x_spiral, y_spiral, z_spiral, B = compute_parker_spiral_surface()
-    
     # Create logarithmic color mapping for magnetic field strength
-    norm = colors.LogNorm(vmin=np.min(B), vmax=np.max(B))
+    # B = B0_norm * sqrt(1/r^4 + (k sin(theta))^2 / r^2) is monotonic in r,
+    # so its extremes lie in the first and last columns (r_min and r_max, in
+    # either order): reductions over 2 * n_phi values instead of two full scans
+    edges = B[:, [0, -1]]
+    norm = colors.LogNorm(vmin=edges.min(), vmax=edges.max())
     cmap = plt.cm.viridis
-    facecolors = cmap(norm(B))
+    # One color per quad, sampled at its first vertex as plot_surface does,
+    # as uint8 RGBA (a quarter of the size of the float64 colors)
+    facecolors = cmap(norm(B[:-1, :-1]), bytes=True)
     
     # Plot the spiral surface
-    surf = ax.plot_surface(x_spiral, y_spiral, z_spiral, 
-                          facecolors=facecolors,
-                          rstride=1, cstride=1, 
-                          linewidth=0, 
-                          antialiased=False, 
-                          alpha=0.8)
+    surf = plot_surface_quads(ax, x_spiral, y_spiral, z_spiral,
+                              facecolors,
+                              linewidth=0,
+                              antialiased=False,
+                              alpha=0.8)
     
     # Add colorbar
     mappable = plt.cm.ScalarMappable(cmap=cmap, norm=norm)
@@ -211,139 +311,86 @@ def plot_positions_with_parker(psp_pos, mms_pos):
     cbar = fig.colorbar(mappable, ax=ax, shrink=0.5, aspect=10)
     cbar.set_label("Normalized Magnetic Field Strength (log scale)")
     
-    # Plot Sun at origin
-    ax.scatter(0, 0, 0, color='yellow', s=200, label="Sun")
-    ax.text(0, 0, 0, "Sun", color='orange')
-    
-    # Plot Earth at (1,0,0) AU
-    ax.scatter(1, 0, 0, color='blue', s=100, label="Earth")
-    ax.text(1, 0, 0, "Earth", color='blue')
-    
-    # Plot PSP
-    ax.scatter(psp_pos[0], psp_pos[1], psp_pos[2], 
-               color='red', s=100, label="PSP")
-    ax.text(psp_pos[0], psp_pos[1], psp_pos[2], "PSP", color='red')
-    
-    # Plot MMS
-    ax.scatter(mms_pos[0], mms_pos[1], mms_pos[2], 
-               color='green', s=100, label="MMS")
-    ax.text(mms_pos[0], mms_pos[1], mms_pos[2], "MMS", color='green')
+    # Plot Sun, Earth, PSP and MMS
+    scatter_bodies(ax, bodies, colors=body_colors, sizes=body_sizes)
     
     ax.set_xlabel("X (AU)")
     ax.set_ylabel("Y (AU)")
     ax.set_zlabel("Z (AU)")
-    ax.legend()
     ax.set_title("Heliospheric Current Sheet with Parker Spiral\n"
                  "and Positions of Sun, Earth, PSP & MMS")
     
     # Set equal aspect ratio
     ax.set_box_aspect([1, 1, 1])
 
-    plt.show()
+    # Save before showing: the window is then rendered at screen resolution
+    # only once, and the file no longer comes out blank once show() has
+    # closed the figure. With the Agg backend there is nothing to show.
+    fig.savefig(filename, dpi=300, bbox_inches='tight')
+    print(f"\nPlot saved as '{filename}'")
+    if plt.get_backend().lower() != 'agg':
+        plt.show()
+    plt.close(fig)
+
+def parse_args(argv=None):
+    """
+    Parse the spiral parameters from the command line.
     
-    plt.savefig('plot_with_parker_spiral.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    print("\nPlot saved as 'plot_with_parker_spiral.png'")
+    Options left out keep their default; when none is given and stdin is a
+    terminal, main() prompts for all of them instead, e.g.
+    
+        python psp_plus_mms_plus_parker_spiral.py --tilt 5 --v-sw 600
+    """
+    parser = argparse.ArgumentParser(
+        description="Plot PSP and MMS with the Parker spiral / heliospheric current sheet")
+    for name, prompt, default in SPIRAL_PARAMETERS:
+        parser.add_argument("--" + name.replace("_", "-"), type=float,
+                            help=f"{prompt} (default: {default})")
+    return parser.parse_args(argv)
 
-def main():
+def main(argv=None):
     # ----------------------------
     # 1. Get user parameters for the spiral
     # ----------------------------
-    print("Enter parameters for the Parker Spiral / Heliospheric Current Sheet.")
-    print("Press Enter to use default values.")
-    tilt_deg = get_input("Tilt angle (deg)", 10.0)
-    amp_deg = get_input("Undulation amplitude (deg)", 15.0)
-    solar_rot_days = get_input("Solar rotation period (days)", 25.4)
-    v_sw_km_s = get_input("Solar wind speed (km/s)", 400.0)
-    r_max = get_input("Radial extent (AU)", 1.5)
+    args = vars(parse_args(argv))
+    if all(value is None for value in args.values()) and sys.stdin.isatty():
+        print("Enter parameters for the Parker Spiral / Heliospheric Current Sheet.")
+        print("Press Enter to use default values.")
+        values = [get_input(prompt, default) for _, prompt, default in SPIRAL_PARAMETERS]
+    else:
+        values = [default if args[name] is None else args[name]
+                  for name, _, default in SPIRAL_PARAMETERS]
+    tilt_deg, amp_deg, solar_rot_days, v_sw_km_s, r_max = values
     
     # ----------------------------
-    # 2. Compute the Parker spiral surface and get grid parameters
+    # 2. Compute the Parker spiral surface and fetch spacecraft positions.
+    #    The surface takes milliseconds and is computed on the main thread:
+    #    the parallel Numba kernel must not be launched from a worker thread
+    #    (with the TBB threading layer the process then never exits). Only
+    #    the two network queries overlap (see psp_plus_mms._gather_positions).
     # ----------------------------
-    x_spiral, y_spiral, z_spiral, B = compute_parker_spiral_surface(
+    surface = compute_parker_spiral_surface(
         r_min=0.1, r_max=r_max, n_r=100, n_phi=100,
         tilt_deg=tilt_deg, amp_deg=amp_deg,
         solar_rot_days=solar_rot_days, v_sw_km_s=v_sw_km_s
     )
     
-    # ----------------------------
-    # 3. Fetch spacecraft positions
-    # ----------------------------
-    print("Fetching PSP position...")
-    psp_pos = fetch_psp_position_horizons()
-    print("PSP Position (AU relative to Sun):", psp_pos)
+    print("Fetching PSP and MMS positions...")
+    psp_pos, mms_pos = asyncio.run(_gather_positions())
+    print("PSP Position (AU relative to Sun):", psp_pos.to_array()[0])
     
-    print("Fetching MMS position...")
-    mms_pos = fetch_mms_position("mms1")
     if mms_pos is None:
         print("Could not retrieve MMS position.")
         return
-    print("MMS Position (km relative to Earth, GSE):", mms_pos)
+    print("MMS Position (km relative to Earth, GSE):", mms_pos.to_array()[0])
     
     # Convert MMS position from km to AU and shift by Earth's heliocentric position.
-    mms_pos_au_rel = (mms_pos[0] / 1.4959787e8, mms_pos[1] / 1.4959787e8, mms_pos[2] / 1.4959787e8)
-    earth_heliocentric = (1.0, 0.0, 0.0)  # Approximate Earth position in heliocentric coordinates
-    mms_heliocentric = (
-        earth_heliocentric[0] + mms_pos_au_rel[0],
-        earth_heliocentric[1] + mms_pos_au_rel[1],
-        earth_heliocentric[2] + mms_pos_au_rel[2]
-    )
+    mms_heliocentric = gse_to_heliocentric(mms_pos)
     
     # ----------------------------
-    # 4. Create the combined 3D plot with a log-scaled colorbar for B
+    # 3. Create the combined 3D plot with a log-scaled colorbar for B
     # ----------------------------
-    fig = plt.figure(figsize=(12, 10))
-    ax = fig.add_subplot(111, projection='3d')
-    
-    # Use a logarithmic normalization for the magnetic field.
-    # Ensure the minimum value is > 0.
-    norm = colors.LogNorm(vmin=np.min(B), vmax=np.max(B))
-    cmap = plt.cm.viridis
-    facecolors = cmap(norm(B))
-    
-    # Plot the spiral surface colored by the normalized magnetic field.
-    surf = ax.plot_surface(x_spiral, y_spiral, z_spiral, facecolors=facecolors,
-                           rstride=1, cstride=1, linewidth=0, antialiased=False, alpha=0.8)
-    
-    # Create a ScalarMappable for the colorbar with log normalization.
-    mappable = plt.cm.ScalarMappable(cmap=cmap, norm=norm)
-    mappable.set_array(B)
-    cbar = fig.colorbar(mappable, ax=ax, shrink=0.5, aspect=10)
-    cbar.set_label("Normalized B (log scale, B at 1 AU = 1)")
-    
-    # Plot the Sun at the origin (0,0,0)
-    ax.scatter(0, 0, 0, color='yellow', s=200, label="Sun")
-    ax.text(0, 0, 0, "Sun", color='orange')
-    
-    # Plot Earth (assumed at (1,0,0) AU)
-    ax.scatter(earth_heliocentric[0], earth_heliocentric[1], earth_heliocentric[2],
-               color='blue', s=100, label="Earth")
-    ax.text(earth_heliocentric[0], earth_heliocentric[1], earth_heliocentric[2],
-            "Earth", color='blue')
-    
-    # Plot PSP position (already in AU relative to Sun)
-    ax.scatter(psp_pos[0], psp_pos[1], psp_pos[2], color='red', s=100, label="PSP")
-    ax.text(psp_pos[0], psp_pos[1], psp_pos[2], "PSP", color='red')
-    
-    # Plot MMS position (converted to heliocentric AU)
-    ax.scatter(mms_heliocentric[0], mms_heliocentric[1], mms_heliocentric[2],
-               color='green', s=100, label="MMS")
-    ax.text(mms_heliocentric[0], mms_heliocentric[1], mms_heliocentric[2],
-            "MMS", color='green')
-    
-    ax.set_xlabel("X (AU)")
-    ax.set_ylabel("Y (AU)")
-    ax.set_zlabel("Z (AU)")
-    ax.legend()
-    ax.set_title("Heliospheric Current Sheet with Parker Spiral\n"
-                 "Colored by Norm. B (log scale, B at 1 AU = 1)\n"
-                 "and Positions of Sun, Earth, PSP & MMS")
-    ax.set_box_aspect((1, 1, 1))  # Equal scaling for all axes
-    
-    # Save the plot instead of showing it
-    plt.savefig('plot_withparker_spiral.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    print("\nPlot saved as 'parker_spiral.png'")
+    plot_positions_with_parker(psp_pos, mms_heliocentric, surface=surface)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file